@@ -9,3 +9,5 @@ DATA_DIRECTORY = ROOT.joinpath("_data")
 #: Path to the file containing metadata about members of the OBO Operations Committee
 OPERATIONS_METADATA_PATH = DATA_DIRECTORY.joinpath("operations.yml")
 ALUMNI_METADATA_PATH = DATA_DIRECTORY.joinpath("alumni.yml")
+#: Directory for caching responses from remote services, like the Wikidata SPARQL endpoint
+CACHE_DIRECTORY = pathlib.Path.home().joinpath(".cache", "obofoundry")
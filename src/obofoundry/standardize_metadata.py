@@ -82,7 +82,7 @@ def update_markdown(path: pathlib.Path) -> None:
         lines = [line.rstrip("\n") for line in file]
 
     assert lines[0] == "---"
-    idx = min(i for i, line in enumerate(lines[1:], start=1) if line == "---")
+    idx = lines.index("---", 1)
 
     # Load the data like it is YAML
     data = yaml.safe_load(StringIO("\n".join(lines[1:idx])))
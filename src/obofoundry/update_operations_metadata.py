@@ -1,56 +1,121 @@
 """Run this script to update the operations metadata."""
 
+from datetime import timedelta
+from itertools import islice
 from pathlib import Path
 from textwrap import dedent
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
 import click
 import yaml
-from tqdm import tqdm
 
 from obofoundry.constants import ALUMNI_METADATA_PATH, OPERATIONS_METADATA_PATH
 from obofoundry.utils import query_wikidata
 
+#: The maximum number of ORCID identifiers to look up in a single SPARQL query
+WIKIDATA_CHUNK_SIZE = 300
+
 
 @click.command(name="update-operations-metadata")
-def main():
+@click.option(
+    "--cache-ttl",
+    type=float,
+    help="Reuse Wikidata query results cached within this many hours",
+)
+def main(cache_ttl: Optional[float]):
     """Update the operations committee members metadata file by querying Wikidata."""
-    _main(ALUMNI_METADATA_PATH)
-    _main(OPERATIONS_METADATA_PATH)
+    paths = [ALUMNI_METADATA_PATH, OPERATIONS_METADATA_PATH]
+    path_to_metadata = {path: yaml.safe_load(path.read_text()) for path in paths}
+    # Look up the members missing from both files in one go
+    orcid_to_wikidata = get_orcid_to_wikidata(
+        (
+            member["orcid"]
+            for operations_metadata in path_to_metadata.values()
+            for member in _get_missing(operations_metadata)
+        ),
+        cache_ttl=timedelta(hours=cache_ttl) if cache_ttl else None,
+    )
+    for path, operations_metadata in path_to_metadata.items():
+        _main(path, operations_metadata, orcid_to_wikidata)
+
+
+def _get_missing(operations_metadata) -> List[Dict[str, Any]]:
+    return [
+        member
+        for member in operations_metadata["members"]
+        if "wikidata" not in member or "github" not in member
+    ]
 
 
-def _main(path: Path):
-    operations_metadata = yaml.safe_load(path.read_text())
-    for member in tqdm(operations_metadata["members"]):
+def _main(
+    path: Path,
+    operations_metadata,
+    orcid_to_wikidata: Mapping[str, Tuple[str, Optional[str]]],
+):
+    missing = _get_missing(operations_metadata)
+    if not missing:
+        return
+    for member in missing:
         orcid = member["orcid"]
-        if "wikidata" not in member or "github" not in member:
-            tqdm.write(f"{member['name']} ({orcid}) missing wikidata or github")
-            sparql = dedent(
-                f"""\
-                SELECT DISTINCT ?item ?github
-                WHERE
-                {{
-                    ?item wdt:P496 "{orcid}" .
-                    OPTIONAL {{ ?item wdt:P2037 ?github }} .
-                }}
-                LIMIT 1
-                """
-            )
-            res = query_wikidata(sparql)
-            if res:
-                member["wikidata"] = res[0]["item"]["value"].removeprefix(
-                    "http://www.wikidata.org/entity/"
-                )
-                github = res[0].get("github")
-                if github:
-                    member["github"] = github["value"]
-            path.write_text(
-                yaml.safe_dump(
-                    operations_metadata,
-                    sort_keys=True,
-                    width=float("inf"),
-                    allow_unicode=True,
-                )
+        if orcid not in orcid_to_wikidata:
+            click.echo(f"{member['name']} ({orcid}) could not be found in Wikidata")
+            continue
+        wikidata, github = orcid_to_wikidata[orcid]
+        member["wikidata"] = wikidata
+        if github:
+            member["github"] = github
+    path.write_text(
+        yaml.safe_dump(
+            operations_metadata,
+            sort_keys=True,
+            width=float("inf"),
+            allow_unicode=True,
+        )
+    )
+
+
+def get_orcid_to_wikidata(
+    orcids: Iterable[str],
+    *,
+    cache_ttl: Optional[timedelta] = None,
+) -> Dict[str, Tuple[str, Optional[str]]]:
+    """Get a mapping from ORCID identifiers to Wikidata identifiers and GitHub handles.
+
+    ORCID identifiers are looked up in chunks of :data:`WIKIDATA_CHUNK_SIZE` to keep
+    each query well below the Wikidata Query Service's timeout.
+    """
+    rv: Dict[str, Tuple[str, Optional[str]]] = {}
+    for chunk in _chunked(orcids, WIKIDATA_CHUNK_SIZE):
+        values = " ".join(f'"{orcid}"' for orcid in chunk)
+        sparql = dedent(
+            f"""\
+            SELECT DISTINCT ?orcid ?item ?github
+            WHERE
+            {{
+                VALUES ?orcid {{ {values} }}
+                ?item wdt:P496 ?orcid .
+                OPTIONAL {{ ?item wdt:P2037 ?github }} .
+            }}
+            """
+        )
+        for record in query_wikidata(sparql, cache_ttl=cache_ttl):
+            github = record.get("github")
+            rv.setdefault(
+                record["orcid"]["value"],
+                (
+                    record["item"]["value"].removeprefix(
+                        "http://www.wikidata.org/entity/"
+                    ),
+                    github["value"] if github else None,
+                ),
             )
+    return rv
+
+
+def _chunked(iterable: Iterable[str], n: int) -> Iterable[List[str]]:
+    it = iter(iterable)
+    while chunk := list(islice(it, n)):
+        yield chunk
 
 
 if __name__ == "__main__":
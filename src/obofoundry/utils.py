@@ -1,47 +1,163 @@
 """Test data integrity, beyond what's possible with the JSON schema."""
 
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
 import requests
 import yaml
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
-from obofoundry.constants import ONTOLOGY_DIRECTORY, ROOT
+from obofoundry.constants import CACHE_DIRECTORY, ONTOLOGY_DIRECTORY, ROOT
 
 __all__ = [
+    "SESSION",
+    "SafeLoader",
     "get_data",
     "query_wikidata",
+    "get_cached_content",
     "get_new_data",
 ]
 
+#: The libyaml-backed safe loader, if available, since it's much faster
+#: than the pure Python one
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
+@lru_cache(maxsize=1)
 def get_data():
-    """Get ontology data."""
-    ontologies = {}
-    for path in ONTOLOGY_DIRECTORY.glob("*.md"):
-        with open(path) as file:
-            lines = [line.rstrip("\n") for line in file]
+    """Get ontology data.
 
-        assert lines[0] == "---"
-        idx = min(i for i, line in enumerate(lines[1:], start=1) if line == "---")
+    The result is cached since parsing the front matter of every ontology's
+    markdown file is expensive. Don't modify the returned dictionary in place.
+    """
+    ontologies = {}
+    for path in sorted(ONTOLOGY_DIRECTORY.glob("*.md")):
+        text = path.read_text()
+        assert text.startswith("---\n")
+        end = text.index("\n---\n", 3)
 
         # Load the data like it is YAML
-        data = yaml.safe_load("\n".join(lines[1:idx]))
-        data["long_description"] = "".join(lines[idx:])
+        data = yaml.load(text[4:end], Loader=SafeLoader)
+        data["long_description"] = text[end + 1 :].replace("\n", "")
         ontologies[data["id"]] = data
     return ontologies
 
 
 #: WikiData SPARQL endpoint. See https://www.wikidata.org/wiki/Wikidata:SPARQL_query_service#Interfacing
 WIKIDATA_SPARQL = "https://query.wikidata.org/bigdata/namespace/wdq/sparql"
+#: Directory for caching Wikidata SPARQL query results
+WIKIDATA_CACHE_DIRECTORY = CACHE_DIRECTORY.joinpath("wikidata")
+
+#: A shared HTTP session, so connections are kept alive between requests.
+#: Rate limited (429) and temporarily unavailable responses are retried,
+#: respecting the ``Retry-After`` header when one is given.
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": "obofoundry/1.0 (https://obofoundry.org)"})
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=1,
+            status_forcelist=(429, 502, 503, 504),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        ),
+    ),
+)
 
 
-def query_wikidata(query: str):
-    """Query the Wikidata SPARQL endpoint and return JSON."""
-    headers = {"User-Agent": "obofoundry/1.0 (https://obofoundry.org)"}
-    res = requests.get(
-        WIKIDATA_SPARQL, params={"query": query, "format": "json"}, headers=headers
+def query_wikidata(query: str, *, cache_ttl: Optional[timedelta] = None):
+    """Query the Wikidata SPARQL endpoint and return JSON.
+
+    :param query: A SPARQL query
+    :param cache_ttl: If given, results are cached on disk, keyed by a hash of
+        the query, and reused until they are older than this.
+    :returns: The bindings from the results
+    """
+    if cache_ttl:
+        key = hashlib.sha256(query.encode("utf-8")).hexdigest()
+        cache_path = WIKIDATA_CACHE_DIRECTORY.joinpath(key).with_suffix(".json")
+        if cache_path.is_file() and _get_age(cache_path) < cache_ttl:
+            with cache_path.open("rb") as file:
+                return json.load(file)
+
+    res = SESSION.get(
+        WIKIDATA_SPARQL,
+        params={"query": query, "format": "json"},
+        headers={"Accept": "application/sparql-results+json"},
+        timeout=120,
     )
     res.raise_for_status()
     res_json = res.json()
-    return res_json["results"]["bindings"]
+    bindings = res_json["results"]["bindings"]
+
+    if cache_ttl:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(bindings))
+    return bindings
+
+
+def _get_age(path: Path) -> timedelta:
+    return timedelta(seconds=time.time() - path.stat().st_mtime)
+
+
+#: Directory for caching HTTP responses, see :func:`get_cached_content`
+HTTP_CACHE_DIRECTORY = CACHE_DIRECTORY.joinpath("http")
+
+
+def get_cached_content(url: str) -> Optional[bytes]:
+    """Get the content at the URL, or None if it doesn't exist.
+
+    Responses are cached on disk with their ``ETag`` and ``Last-Modified``
+    headers, which are sent back as ``If-None-Match`` and ``If-Modified-Since``
+    on the next request for the same URL. When the server answers with
+    304 Not Modified, the cached content is returned instead of downloading
+    it again. Note that GitHub only exempts 304 responses from its API rate
+    limit for authenticated requests, which these are not.
+
+    :param url: The URL to get
+    :returns: The content, or None if the server responds with 404
+    :raises requests.HTTPError: If the server responds with another error
+    """
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    metadata_path = HTTP_CACHE_DIRECTORY.joinpath(key).with_suffix(".json")
+    content_path = HTTP_CACHE_DIRECTORY.joinpath(key)
+
+    headers = {}
+    if metadata_path.is_file() and content_path.is_file():
+        with metadata_path.open("rb") as file:
+            metadata = json.load(file)
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+
+    res = SESSION.get(url, headers=headers, timeout=60)
+    if res.status_code == 304:
+        return content_path.read_bytes()
+    if res.status_code == 404:
+        return None
+    res.raise_for_status()
+
+    metadata = {
+        "url": url,
+        "etag": res.headers.get("ETag"),
+        "last_modified": res.headers.get("Last-Modified"),
+    }
+    if metadata["etag"] or metadata["last_modified"]:
+        HTTP_CACHE_DIRECTORY.mkdir(parents=True, exist_ok=True)
+        content_path.write_bytes(res.content)
+        metadata_path.write_text(json.dumps(metadata))
+    return res.content
 
 
 def get_new_data():
@@ -54,7 +170,7 @@ def get_new_data():
     """
     data = get_data()
     config_path = ROOT.joinpath("_config.yml")
-    config_data = yaml.safe_load(config_path.read_text())
+    config_data = yaml.load(config_path.read_text(), Loader=SafeLoader)
     published = {record["id"] for record in config_data["ontologies"]}
     return {
         prefix: record for prefix, record in data.items() if prefix not in published
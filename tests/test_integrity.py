@@ -1,17 +1,27 @@
 """Test data integrity, beyond what's possible with the JSON schema."""
 
 import json
+import os
+import re
+import tempfile
 import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import lru_cache
-from io import StringIO
 from pathlib import Path
-from typing import Set
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+from unittest import mock
 
-import requests
 import yaml
 
 from obofoundry.standardize_metadata import ModifiedDumper
-from obofoundry.utils import ONTOLOGY_DIRECTORY, get_data, get_new_data
+from obofoundry.utils import (
+    ONTOLOGY_DIRECTORY,
+    SESSION,
+    SafeLoader,
+    get_cached_content,
+    get_data,
+    get_new_data,
+)
 
 HERE = Path(__file__).parent.resolve()
 ROOT = HERE.parent
@@ -24,6 +34,14 @@ MEDRXIV_PREFIX = "https://www.medrxiv.org/content/"
 ZENODO_PREFIX = "https://zenodo.org/record/"
 DOI_PREFIX = "https://doi.org/"
 CHEMRXIV_DOI_PREFIX = "https://doi.org/10.26434/chemrxiv"
+#: Prefixes for valid publication identifiers
+PUBLICATION_PREFIXES = (DOI_PREFIX, ARXIV_PREFIX, BIORXIV_PREFIX, MEDRXIV_PREFIX)
+#: Prefixes for valid publication identifiers whose local part must be numeric
+NUMERIC_PUBLICATION_PREFIXES = (PUBMED_PREFIX, ZENODO_PREFIX)
+#: Prefixes for preprints, which should be referenced without a version
+PREPRINT_PREFIXES = (ARXIV_PREFIX, BIORXIV_PREFIX, MEDRXIV_PREFIX, CHEMRXIV_DOI_PREFIX)
+#: Matches a version suffix on a preprint identifier, like ``.v2``
+VERSIONED_RE = re.compile(r"\.v\d+$")
 ALLOWED_SPDX = {
     "CC0-1.0",  # see https://bioregistry.io/spdx:CC0-1.0
     "CC-BY-3.0",  # see https://bioregistry.io/spdx:CC-BY-3.0
@@ -35,14 +53,35 @@ OBO_TO_SPDX = {
     "CC0": "CC0-1.0",
 }
 NOR_DASHBOARD_RESULTS = "https://raw.githubusercontent.com/OBOFoundry/obo-nor.github.io/master/dashboard/dashboard-results.yml"
+#: The number of threads used for tests that make many HTTP requests
+MAX_WORKERS = 16
+GITHUB_GRAPHQL = "https://api.github.com/graphql"
+#: Matches a GitHub repository URL, capturing the owner and name
+GITHUB_REPOSITORY_RE = re.compile(r"^https?://github\.com/([^/]+)/([^/#?]+)/?$")
+#: A GitHub token enables looking up all repositories in a single GraphQL query,
+#: otherwise the REST API is queried once per repository
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+#: Locations where GitHub looks for contribution guidelines, see
+#: https://docs.github.com/en/communities/setting-up-your-project-for-healthy-contributions/setting-guidelines-for-repository-contributors
+CONTRIBUTING_PATHS = [
+    # Markdown
+    "CONTRIBUTING.md",
+    "docs/CONTRIBUTING.md",
+    ".github/CONTRIBUTING.md",
+    # RST
+    "CONTRIBUTING.rst",
+    "docs/CONTRIBUTING.rst",
+    ".github/CONTRIBUTING.rst",
+]
 
 
 class TestIntegrity(unittest.TestCase):
     """Test case for data integrity."""
 
-    def setUp(self) -> None:
+    @classmethod
+    def setUpClass(cls) -> None:
         """Set up the test case."""
-        self.ontologies = get_data()
+        cls.ontologies = get_data()
 
     def test_dependencies(self):
         """Test dependencies are valid OBO Foundry ontologies."""
@@ -73,13 +112,13 @@ class TestIntegrity(unittest.TestCase):
                     else:
                         self.assertIn(
                             dependency_id,
-                            set(self.ontologies),
+                            self.ontologies.keys(),
                             msg=f"Ontology {ontology} has invalid dependency at index {i}: {dependency_id}",
                         )
 
     def test_publications(self):
         """Test publications information."""
-        for ontology, data in sorted(self.ontologies.items()):
+        for ontology, data in self.ontologies.items():
             self.assertIn(
                 sum(
                     publication.get("preferred", False)
@@ -126,52 +165,28 @@ class TestIntegrity(unittest.TestCase):
         self.assertIsInstance(identifier, str)
         self.assertFalse(identifier.endswith("/"))
 
-        is_pubmed = (
-            identifier.startswith(PUBMED_PREFIX)
-            and identifier[len(PUBMED_PREFIX) :].isnumeric()
-        )
-        is_zenodo = (
-            identifier.startswith(ZENODO_PREFIX)
-            and identifier[len(ZENODO_PREFIX) :].isnumeric()
-        )
         # TODO add regular expression validation
-        is_doi = identifier.startswith(DOI_PREFIX)
-        is_arxiv = identifier.startswith(ARXIV_PREFIX)
-        is_biorxiv = identifier.startswith(BIORXIV_PREFIX)
-        is_medrxiv = identifier.startswith(MEDRXIV_PREFIX)
-
         self.assertTrue(
-            any(
-                (
-                    is_pubmed,
-                    is_zenodo,
-                    is_doi,
-                    is_arxiv,
-                    is_biorxiv,
-                    is_medrxiv,
-                )
+            identifier.startswith(PUBLICATION_PREFIXES)
+            or any(
+                identifier.startswith(prefix) and identifier[len(prefix) :].isnumeric()
+                for prefix in NUMERIC_PUBLICATION_PREFIXES
             ),
             msg=msg,
         )
 
         # Make sure that the unversioned DOI is used
-        if (
-            is_arxiv
-            or is_biorxiv
-            or is_medrxiv
-            or identifier.startswith(CHEMRXIV_DOI_PREFIX)
-        ):
-            for v in range(1, 100):
-                self.assertFalse(
-                    identifier.endswith(f".v{v}"), msg="Please use an unversioned DOI"
-                )
+        if identifier.startswith(PREPRINT_PREFIXES):
+            self.assertIsNone(
+                VERSIONED_RE.search(identifier), msg="Please use an unversioned DOI"
+            )
 
     def test_schema_mandatory(self):
-        """Test all things in schema marked as error are also in the required list."""
         """Test all things in schema marked as error/warning are also in the required list."""
         # why is there a mismatch between their levels and required status?
         skip_keys = {"in_foundry", "products", "usages"}
-        schema = json.loads(SCHEMA_PATH.read_text())
+        with SCHEMA_PATH.open("rb") as file:
+            schema = json.load(file)
         required: Set[str] = set(schema["required"])
         high_level: Set[str] = {
             key
@@ -216,15 +231,23 @@ class TestIntegrity(unittest.TestCase):
 
     def test_has_purl_config(self):
         """Tests that OBO PURL configuration is available."""
-        for prefix, record in self.ontologies.items():
-            if self.skip_inactive(record):
-                continue
+        prefixes = [
+            prefix
+            for prefix, record in self.ontologies.items()
+            if not self.skip_inactive(record)
+        ]
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {
+                prefix: executor.submit(
+                    get_cached_content,
+                    f"https://raw.githubusercontent.com/OBOFoundry/purl.obolibrary.org/master/config/{prefix}.yml",
+                )
+                for prefix in prefixes
+            }
+        for prefix in prefixes:
             with self.subTest(prefix=prefix):
-                url = f"https://raw.githubusercontent.com/OBOFoundry/purl.obolibrary.org/master/config/{prefix}.yml"
-                res = requests.get(url)
-                self.assertEqual(
-                    200,
-                    res.status_code,
+                self.assertIsNotNone(
+                    futures[prefix].result(),
                     msg=f"PURL configuration is missing for {prefix}",
                 )
 
@@ -236,17 +259,13 @@ class TestStandardizedYaml(unittest.TestCase):
         """Test the YAML is standardized."""
         for path in ONTOLOGY_DIRECTORY.glob("*.md"):
             with self.subTest(prefix=path.stem):
-                with path.open() as file:
-                    lines = [line.rstrip("\n") for line in file]
-
-                self.assertEqual(lines[0], "---")
-                idx = min(
-                    i for i, line in enumerate(lines[1:], start=1) if line == "---"
-                )
+                text = path.read_text()
+                self.assertTrue(text.startswith("---\n"))
+                end = text.index("\n---\n", 3)
 
                 # Load the data like it is YAML
-                chunked = "\n".join(lines[1:idx])
-                data = yaml.safe_load(StringIO(chunked))
+                chunked = text[4:end]
+                data = yaml.load(chunked, Loader=SafeLoader)
                 # These settings should match the standardize_metadata.py dumping sequence
                 dumped = ModifiedDumper.dump(data)
                 self.assertEqual(
@@ -256,15 +275,12 @@ class TestStandardizedYaml(unittest.TestCase):
                 )
 
 
+#: Deletes newlines, spaces, periods, and dashes in :func:`_string_norm`
+_STRING_NORM_TABLE = str.maketrans("", "", "\n .-")
+
+
 def _string_norm(s: str) -> str:
-    return (
-        s.strip()
-        .lower()
-        .replace("\n", "")
-        .replace(" ", "")
-        .replace(".", "")
-        .replace("-", "")
-    )
+    return s.strip().lower().translate(_STRING_NORM_TABLE)
 
 
 class TestModernIntegrity(unittest.TestCase):
@@ -277,9 +293,18 @@ class TestModernIntegrity(unittest.TestCase):
     build.
     """
 
-    def setUp(self) -> None:
+    @classmethod
+    def setUpClass(cls) -> None:
         """Set up the test case."""
-        self.ontologies = get_new_data()
+        cls.ontologies = get_new_data()
+        cls.github_repositories = {}
+        for prefix, data in cls.ontologies.items():
+            repository = data["repository"]
+            if not repository.startswith("https://github.com"):
+                continue
+            # GitHub URLs that can't be parsed are kept, so they fail the GitHub tests
+            match = GITHUB_REPOSITORY_RE.match(repository)
+            cls.github_repositories[prefix] = match.groups() if match else None
 
     def test_github_references(self):
         """Test that new ontologies reference the pull request where they were added."""
@@ -288,26 +313,106 @@ class TestModernIntegrity(unittest.TestCase):
                 self.assertIn("pull_request_added", data)
                 self.assertIn("issue_requested", data)
 
+    def _submit_github_lookups(self, func: Callable[[str], Any]) -> Dict[str, Future]:
+        """Run a lookup for each GitHub repository on a thread pool.
+
+        Futures are returned so a failed lookup is reported on its own
+        prefix's subtest when its result is read.
+        """
+        if GITHUB_TOKEN:
+            # Make the single GraphQL query before the lookups fan out
+            self._get_github_graphql_data(tuple(self.github_repositories))
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            return {
+                prefix: executor.submit(func, prefix)
+                for prefix in self.github_repositories
+            }
+
+    @classmethod
     @lru_cache
-    def _get_github_data(self, prefix: str):
-        data = self.ontologies[prefix]
-        repository = data["repository"]
-        if not repository.startswith("https://github.com"):
-            return None
-        r = repository.removeprefix("https://github.com/").rstrip("/")
-        url = f"https://api.github.com/repos/{r}"
-        res = requests.get(url)
+    def _get_github_graphql_data(
+        cls, prefixes: Tuple[str, ...]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get data for all repositories with a single GitHub GraphQL query.
+
+        The results are shaped like the parts of the REST API's repository
+        data used in these tests, plus whether contribution guidelines exist.
+        Repositories that can't be resolved, e.g., because they were renamed
+        or deleted, map to None.
+        """
+        contributing = " ".join(
+            f'c{j}: object(expression: "HEAD:{path}") {{ id }}'
+            for j, path in enumerate(CONTRIBUTING_PATHS)
+        )
+        fields = []
+        for i, prefix in enumerate(prefixes):
+            repository = cls.github_repositories[prefix]
+            if repository is None:
+                continue
+            owner, name = repository
+            fields.append(
+                f'r{i}: repository(owner: "{owner}", name: "{name}") {{ '
+                f"defaultBranchRef {{ name }} licenseInfo {{ spdxId }} {contributing} }}"
+            )
+        if not fields:
+            return {}
+        res = SESSION.post(
+            GITHUB_GRAPHQL,
+            json={"query": f"query {{ {' '.join(fields)} }}"},
+            headers={"Authorization": f"bearer {GITHUB_TOKEN}"},
+        )
         res.raise_for_status()
-        return res.json()
+        res_json = res.json()
+        # A repository that can't be resolved only nulls out its own alias,
+        # so the errors are only fatal when no data comes back at all
+        if res_json.get("data") is None:
+            raise ValueError(res_json["errors"])
+        rv: Dict[str, Optional[Dict[str, Any]]] = {}
+        for i, prefix in enumerate(prefixes):
+            record = res_json["data"].get(f"r{i}")
+            if record is None:
+                rv[prefix] = None
+                continue
+            # A repository without any commits has no default branch
+            default_branch_ref = record["defaultBranchRef"] or {}
+            license_info = record["licenseInfo"] or {}
+            rv[prefix] = {
+                "default_branch": default_branch_ref.get("name"),
+                "license": {"spdx_id": license_info.get("spdxId")},
+                "has_contribution_guidelines": any(
+                    record[f"c{j}"] for j in range(len(CONTRIBUTING_PATHS))
+                ),
+            }
+        return rv
+
+    def _get_github_repository(self, prefix: str) -> Tuple[str, str]:
+        repository = self.github_repositories[prefix]
+        if repository is None:
+            raise ValueError(
+                f"Could not parse GitHub repository URL: {self.ontologies[prefix]['repository']}"
+            )
+        return repository
+
+    @lru_cache
+    def _get_github_data(self, prefix: str) -> Dict[str, Any]:
+        owner, name = self._get_github_repository(prefix)
+        if GITHUB_TOKEN:
+            prefixes = tuple(self.github_repositories)
+            github_data = self._get_github_graphql_data(prefixes)[prefix]
+        else:
+            content = get_cached_content(f"https://api.github.com/repos/{owner}/{name}")
+            github_data = None if content is None else json.loads(content)
+        if github_data is None:
+            raise ValueError(f"GitHub repository does not exist: {owner}/{name}")
+        return github_data
 
     def test_repository_license(self):
         """Test that the repository has a license that's correct."""
-        for prefix, data in self.ontologies.items():
-            repository = data["repository"]
-            if not repository.startswith("https://github.com"):
-                continue
+        futures = self._submit_github_lookups(self._get_github_data)
+        for prefix, future in futures.items():
+            data = self.ontologies[prefix]
             with self.subTest(prefix=prefix):
-                github_data = self._get_github_data(prefix)
+                github_data = future.result()
                 self.assertIn("license", github_data)
                 self.assertIn("spdx_id", github_data["license"])
                 spdx = github_data["license"]["spdx_id"]
@@ -338,7 +443,12 @@ class TestModernIntegrity(unittest.TestCase):
 
     def test_nor_dashboard(self):
         """Test that the ontology is in and passes the NOR dashboard."""
-        nor_data = yaml.safe_load(requests.get(NOR_DASHBOARD_RESULTS).content)
+        content = get_cached_content(NOR_DASHBOARD_RESULTS)
+        self.assertIsNotNone(
+            content,
+            msg=f"Could not find NOR dashboard results at {NOR_DASHBOARD_RESULTS}",
+        )
+        nor_data = yaml.load(content, Loader=SafeLoader)
         nor_ontologies = {
             record["namespace"]: record for record in nor_data["ontologies"]
         }
@@ -346,7 +456,7 @@ class TestModernIntegrity(unittest.TestCase):
             with self.subTest(prefix=prefix):
                 self.assertIn(
                     prefix,
-                    set(nor_ontologies),
+                    nor_ontologies.keys(),
                     msg=f"Need to add `{prefix}` to the New Ontlogy Request Dashboard "
                     f"(https://github.com/OBOFoundry/obo-nor.github.io)",
                 )
@@ -370,26 +480,145 @@ class TestModernIntegrity(unittest.TestCase):
 
     def test_contribution_guidelines(self):
         """Test that a contribution guidelines document is available in an expected location/format."""
-        for prefix, data in self.ontologies.items():
-            repository = data["repository"]
-            if not repository.startswith("https://github.com"):
-                continue
-            r = repository.removeprefix("https://github.com/").rstrip("/")
-            github_data = self._get_github_data(prefix)
-            default_branch = github_data["default_branch"]
-            paths = [
-                # Markdown
-                f"https://github.com/{r}/blob/{default_branch}/CONTRIBUTING.md",
-                f"https://github.com/{r}/blob/{default_branch}/docs/CONTRIBUTING.md",
-                f"https://github.com/{r}/blob/{default_branch}/.github/CONTRIBUTING.md",
-                # RST
-                f"https://github.com/{r}/blob/{default_branch}/CONTRIBUTING.rst",
-                f"https://github.com/{r}/blob/{default_branch}/docs/CONTRIBUTING.rst",
-                f"https://github.com/{r}/blob/{default_branch}/.github/CONTRIBUTING.rst",
-            ]
-            self.assertTrue(
-                any(requests.get(path).status_code == 200 for path in paths),
-                msg=f"Could not find a CONTRIBUTING.md file in the repository for {prefix} ({repository}) in any of "
-                "the standard locations defined by GitHub in https://docs.github.com/en/communities/setting-up-"
-                "your-project-for-healthy-contributions/setting-guidelines-for-repository-contributors.",
-            )
+        futures = self._submit_github_lookups(self._has_contribution_guidelines)
+        for prefix, future in futures.items():
+            with self.subTest(prefix=prefix):
+                self.assertTrue(
+                    future.result(),
+                    msg=f"Could not find a CONTRIBUTING.md file in the repository for {prefix} "
+                    f"({self.ontologies[prefix]['repository']}) in any of the standard locations "
+                    "defined by GitHub in https://docs.github.com/en/communities/setting-up-"
+                    "your-project-for-healthy-contributions/setting-guidelines-for-repository-contributors.",
+                )
+
+    def _has_contribution_guidelines(self, prefix: str) -> bool:
+        github_data = self._get_github_data(prefix)
+        if GITHUB_TOKEN:
+            return github_data["has_contribution_guidelines"]
+        owner, name = self._get_github_repository(prefix)
+        default_branch = github_data["default_branch"]
+        base = f"https://github.com/{owner}/{name}/blob/{default_branch}"
+        return any(
+            SESSION.get(f"{base}/{path}").status_code == 200
+            for path in CONTRIBUTING_PATHS
+        )
+
+
+class TestGitHubGraphQL(unittest.TestCase):
+    """Test handling of GitHub GraphQL responses, without making requests."""
+
+    def _get_github_graphql_data(self, repositories, response=None):
+        # Don't leave mocked results in the cache shared with TestModernIntegrity
+        self.addCleanup(TestModernIntegrity._get_github_graphql_data.cache_clear)
+        res = mock.Mock()
+        res.json.return_value = response
+        with mock.patch.object(
+            TestModernIntegrity, "github_repositories", repositories, create=True
+        ), mock.patch.object(SESSION, "post", return_value=res) as post:
+            rv = TestModernIntegrity._get_github_graphql_data(tuple(repositories))
+        return rv, post
+
+    def test_no_repositories(self):
+        """Test that no query is made when there are no repositories."""
+        rv, post = self._get_github_graphql_data({})
+        self.assertEqual({}, rv)
+        post.assert_not_called()
+
+    def test_partial_failure(self):
+        """Test that a repository that can't be resolved doesn't fail the others."""
+        contributing = {f"c{j}": None for j in range(len(CONTRIBUTING_PATHS))}
+        response = {
+            "data": {
+                "r0": {
+                    "defaultBranchRef": {"name": "main"},
+                    "licenseInfo": {"spdxId": "CC-BY-4.0"},
+                    **contributing,
+                    "c0": {"id": "1"},
+                },
+                "r1": None,
+                "r2": {
+                    "defaultBranchRef": None,
+                    "licenseInfo": None,
+                    **contributing,
+                },
+            },
+            "errors": [{"type": "NOT_FOUND", "path": ["r1"]}],
+        }
+        repositories = {
+            "test-found": ("o", "found"),
+            "test-missing": ("o", "missing"),
+            "test-empty": ("o", "empty"),
+        }
+        rv, _ = self._get_github_graphql_data(repositories, response)
+        self.assertEqual(
+            {
+                "test-found": {
+                    "default_branch": "main",
+                    "license": {"spdx_id": "CC-BY-4.0"},
+                    "has_contribution_guidelines": True,
+                },
+                "test-missing": None,
+                "test-empty": {
+                    "default_branch": None,
+                    "license": {"spdx_id": None},
+                    "has_contribution_guidelines": False,
+                },
+            },
+            rv,
+        )
+
+    def test_failure(self):
+        """Test that an error is raised when the query itself fails."""
+        response = {"errors": [{"message": "Parse error"}]}
+        with self.assertRaises(ValueError):
+            self._get_github_graphql_data({"test-error": ("o", "r")}, response)
+
+
+class TestCachedContent(unittest.TestCase):
+    """Test the on-disk HTTP cache, without making requests."""
+
+    url = "https://example.org/data.yml"
+
+    def setUp(self) -> None:
+        """Point the HTTP cache at a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        patcher = mock.patch("obofoundry.utils.HTTP_CACHE_DIRECTORY", self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _response(status_code: int, content: bytes = b"", headers=None):
+        return mock.Mock(
+            status_code=status_code, content=content, headers=headers or {}
+        )
+
+    def _get_cached_content(self, *responses):
+        with mock.patch.object(SESSION, "get", side_effect=responses) as get:
+            rv = [get_cached_content(self.url) for _ in responses]
+        return rv, [call.kwargs["headers"] for call in get.call_args_list]
+
+    def test_not_modified(self):
+        """Test that the cached content is revalidated and reused."""
+        rv, headers = self._get_cached_content(
+            self._response(200, b"data", {"ETag": '"abc"'}),
+            self._response(304),
+        )
+        self.assertEqual([b"data", b"data"], rv)
+        self.assertEqual([{}, {"If-None-Match": '"abc"'}], headers)
+
+    def test_no_validator(self):
+        """Test that responses without an ETag or Last-Modified aren't cached."""
+        rv, headers = self._get_cached_content(
+            self._response(200, b"old"),
+            self._response(200, b"new"),
+        )
+        self.assertEqual([b"old", b"new"], rv)
+        self.assertEqual([{}, {}], headers)
+        self.assertFalse(self.directory.exists() and any(self.directory.iterdir()))
+
+    def test_missing(self):
+        """Test that None is returned for content that doesn't exist."""
+        rv, _ = self._get_cached_content(self._response(404))
+        self.assertEqual([None], rv)
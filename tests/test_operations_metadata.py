@@ -0,0 +1,99 @@
+"""Test looking up operations committee members in Wikidata, without making requests."""
+
+import os
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from obofoundry.update_operations_metadata import (
+    WIKIDATA_CHUNK_SIZE,
+    get_orcid_to_wikidata,
+)
+from obofoundry.utils import SESSION, query_wikidata
+
+BINDINGS = [{"orcid": {"value": "0000-0000-0000-0001"}}]
+
+
+class TestQueryWikidata(unittest.TestCase):
+    """Test the on-disk cache for Wikidata query results."""
+
+    def setUp(self) -> None:
+        """Point the Wikidata cache at a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        patcher = mock.patch(
+            "obofoundry.utils.WIKIDATA_CACHE_DIRECTORY", self.directory
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _query_wikidata(self, cache_ttl: timedelta):
+        res = mock.Mock()
+        res.json.return_value = {"results": {"bindings": BINDINGS}}
+        with mock.patch.object(SESSION, "get", return_value=res) as get:
+            rv = query_wikidata("SELECT ?x WHERE {}", cache_ttl=cache_ttl)
+        self.assertEqual(BINDINGS, rv)
+        return get.call_count
+
+    def test_fresh(self):
+        """Test that a fresh cached result is reused without a request."""
+        self.assertEqual(1, self._query_wikidata(timedelta(hours=1)))
+        self.assertEqual(0, self._query_wikidata(timedelta(hours=1)))
+
+    def test_expired(self):
+        """Test that an expired cached result is queried again."""
+        self.assertEqual(1, self._query_wikidata(timedelta(hours=1)))
+        (cache_path,) = self.directory.iterdir()
+        two_hours_ago = time.time() - 2 * 60 * 60
+        os.utime(cache_path, (two_hours_ago, two_hours_ago))
+        self.assertEqual(1, self._query_wikidata(timedelta(hours=1)))
+
+
+class TestOrcidToWikidata(unittest.TestCase):
+    """Test looking up Wikidata identifiers for ORCID identifiers."""
+
+    def test_chunked(self):
+        """Test that ORCID identifiers are looked up in chunks."""
+        orcids = [f"0000-0000-0000-{i:04}" for i in range(650)]
+        with mock.patch(
+            "obofoundry.update_operations_metadata.query_wikidata",
+            return_value=[],
+        ) as query:
+            get_orcid_to_wikidata(orcids)
+        self.assertEqual(3, query.call_count)
+        for call, n in zip(query.call_args_list, [WIKIDATA_CHUNK_SIZE] * 2 + [50]):
+            self.assertEqual(n, call.args[0].count('"0000-0000-0000-'))
+
+    def test_first_result(self):
+        """Test that the first result is kept when an ORCID matches several rows."""
+        records = [
+            {
+                "orcid": {"value": "0000-0000-0000-0001"},
+                "item": {"value": "http://www.wikidata.org/entity/Q1"},
+                "github": {"value": "first"},
+            },
+            {
+                "orcid": {"value": "0000-0000-0000-0001"},
+                "item": {"value": "http://www.wikidata.org/entity/Q2"},
+            },
+            {
+                "orcid": {"value": "0000-0000-0000-0002"},
+                "item": {"value": "http://www.wikidata.org/entity/Q3"},
+            },
+        ]
+        with mock.patch(
+            "obofoundry.update_operations_metadata.query_wikidata",
+            return_value=records,
+        ):
+            rv = get_orcid_to_wikidata(["0000-0000-0000-0001", "0000-0000-0000-0002"])
+        self.assertEqual(
+            {
+                "0000-0000-0000-0001": ("Q1", "first"),
+                "0000-0000-0000-0002": ("Q3", None),
+            },
+            rv,
+        )
@@ -37,21 +37,25 @@ def main(args):
     stream = open(args.input, "r")
     data = yaml.load(stream, Loader=yaml.SafeLoader)
 
-    print("@prefix sh:	<http://www.w3.org/ns/shacl#> .")
-    print("@prefix xsd:    <http://www.w3.org/2001/XMLSchema#> .")
-    print("[")
-    print(" sh:declare")
-    sep = ""
+    declarations = []
     for ont in data["ontologies"]:
         # if ont.get("is_obsolete", False):
         #    continue
         # See https://github.com/OBOFoundry/OBOFoundry.github.io/issues/1976
-        prefix = ont.get("preferredPrefix", ont["id"].upper())
-        print(
-            f'{sep}[ sh:prefix "{prefix}" ; sh:namespace "http://purl.obolibrary.org/obo/{prefix}_"]'
+        prefix = ont.get("preferredPrefix") or ont["id"].upper()
+        declarations.append(
+            f'[ sh:prefix "{prefix}" ; sh:namespace "http://purl.obolibrary.org/obo/{prefix}_"]'
         )
-        sep = ","
-    print("] .")
+
+    lines = [
+        "@prefix sh:	<http://www.w3.org/ns/shacl#> .",
+        "@prefix xsd:    <http://www.w3.org/2001/XMLSchema#> .",
+        "[",
+        " sh:declare",
+        "\n,".join(declarations),
+        "] .",
+    ]
+    print("\n".join(lines))
 
 
 if __name__ == "__main__":